@@ -1,12 +1,24 @@
 import pandas as pd
 from pptx import Presentation
-from pptx.chart.data import CategoryChartData
+from pptx.chart.data import BubbleChartData, CategoryChartData, XyChartData
 from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
+from pptx.enum.shapes import PP_PLACEHOLDER
 from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+from copy import deepcopy
+from lxml import etree
+from xml.sax.saxutils import quoteattr
+import hashlib
+import math
 import os
+import posixpath
+import time
+import zipfile
+import zlib
 
 # Input/Output files (defaults)
 excel_file = "data.xlsx"
@@ -37,8 +49,965 @@ CHART_TYPES = {
     "Doughnut Chart": XL_CHART_TYPE.DOUGHNUT,
     "Stacked Bar": XL_CHART_TYPE.BAR_STACKED,
     "Stacked Column": XL_CHART_TYPE.COLUMN_STACKED,
+    "XY Scatter": XL_CHART_TYPE.XY_SCATTER,
+    "Bubble Chart": XL_CHART_TYPE.BUBBLE,
+    "Column + Line": XL_CHART_TYPE.COLUMN_CLUSTERED,
+    "Stacked Column + Line": XL_CHART_TYPE.COLUMN_STACKED,
 }
 
+# Combo charts are built as their column chart, then line series are moved to a secondary axis
+COMBO_CHART_NAMES = ("Column + Line", "Stacked Column + Line")
+
+# Roles a selected column can take, per kind of chart
+SERIES_ROLES = {
+    'category': ("Series",),
+    'xy': ("X Values", "Y Values"),
+    'bubble': ("X Values", "Y Values", "Bubble Size"),
+    'combo': ("Columns", "Line (Secondary Axis)"),
+}
+ROLE_REQUIREMENTS = {
+    'category': "at least one column",
+    'xy': "exactly one X Values column and at least one Y Values column",
+    'bubble': "exactly one X Values column, one Bubble Size column and at least one Y Values column",
+    'combo': "at least one Columns series",
+}
+
+
+def chart_kind(chart_type_name):
+    """Which kind of chart data a chart type needs: category, xy, bubble or combo"""
+    if chart_type_name in COMBO_CHART_NAMES:
+        return 'combo'
+    chart_type = CHART_TYPES.get(chart_type_name)
+    if chart_type == XL_CHART_TYPE.XY_SCATTER:
+        return 'xy'
+    if chart_type == XL_CHART_TYPE.BUBBLE:
+        return 'bubble'
+    return 'category'
+
+
+def roles_complete(kind, roles):
+    """Check that a role assignment has what the chart kind needs"""
+    if any(role not in SERIES_ROLES[kind] for role in roles):
+        return False
+    if kind == 'xy':
+        return roles.count("X Values") == 1 and roles.count("Y Values") >= 1
+    if kind == 'bubble':
+        return (roles.count("X Values") == 1 and roles.count("Bubble Size") == 1
+                and roles.count("Y Values") >= 1)
+    return roles.count(SERIES_ROLES[kind][0]) >= 1
+
+
+def default_series_roles(kind, count):
+    """Default roles for `count` selected columns, in selection order"""
+    if kind == 'xy' and count >= 2:
+        return ["X Values"] + ["Y Values"] * (count - 1)
+    if kind == 'bubble' and count >= 3:
+        return ["X Values"] + ["Y Values"] * (count - 2) + ["Bubble Size"]
+    if kind == 'combo' and count >= 2:
+        return ["Columns"] * (count - 1) + ["Line (Secondary Axis)"]
+    return [SERIES_ROLES[kind][0]] * count
+
+
+def resolve_series_roles(kind, roles, count):
+    """Use the saved roles if they still fit the chart kind, otherwise the defaults"""
+    if roles and len(roles) == count and roles_complete(kind, roles):
+        return list(roles)
+    roles = default_series_roles(kind, count)
+    if not roles_complete(kind, roles):
+        raise ValueError(f"This chart type needs {ROLE_REQUIREMENTS[kind]}")
+    return roles
+
+# Chart type groups used by the style engine
+PIE_CHART_TYPES = (XL_CHART_TYPE.PIE, XL_CHART_TYPE.DOUGHNUT)
+BAR_CHART_TYPES = (
+    XL_CHART_TYPE.BAR_CLUSTERED, XL_CHART_TYPE.COLUMN_CLUSTERED,
+    XL_CHART_TYPE.BAR_STACKED, XL_CHART_TYPE.COLUMN_STACKED,
+)
+LINE_CHART_TYPES = (XL_CHART_TYPE.LINE,)
+XY_CHART_TYPES = (XL_CHART_TYPE.XY_SCATTER, XL_CHART_TYPE.BUBBLE)
+# Plots whose python-pptx tag sequence can't place dLbls (missing on scatter,
+# after bubbleScale on bubble); the schema puts dLbls right after the last ser
+SER_ANCHORED_DLBLS_PLOTS = (qn('c:scatterChart'), qn('c:bubbleChart'))
+
+# Grid layouts: charts per slide -> (rows, columns)
+GRID_LAYOUTS = {
+    1: (1, 1),
+    2: (1, 2),
+    4: (2, 2),
+    6: (2, 3),
+}
+
+# Area of the slide that holds the chart(s)
+CHART_AREA = (Inches(1), Inches(2), Inches(8), Inches(5))
+GRID_GAP = Inches(0.2)
+
+
+def grid_chart_box(position, charts_per_slide):
+    """Return (x, y, cx, cy) for the chart at a position in the slide grid"""
+    rows, cols = GRID_LAYOUTS.get(charts_per_slide, (1, 1))
+    left, top, width, height = CHART_AREA
+    cell_width = (width - GRID_GAP * (cols - 1)) // cols
+    cell_height = (height - GRID_GAP * (rows - 1)) // rows
+    row, col = divmod(position % (rows * cols), cols)
+    x = left + col * (cell_width + GRID_GAP)
+    y = top + row * (cell_height + GRID_GAP)
+    return x, y, cell_width, cell_height
+
+
+# Template placeholders that can be filled with a chart in place
+FILLABLE_PLACEHOLDERS = (PP_PLACEHOLDER.CHART, PP_PLACEHOLDER.OBJECT)
+
+
+def find_template_chart_slots(prs, start_index):
+    """Return (slide, placeholder) pairs for empty chart/content placeholders from start_index on"""
+    slots = []
+    for slide in list(prs.slides)[start_index:]:
+        for placeholder in slide.placeholders:
+            if placeholder.placeholder_format.type not in FILLABLE_PLACEHOLDERS:
+                continue
+            # Placeholders already holding a chart, table or picture are graphic frames
+            if placeholder.has_text_frame and not placeholder.text_frame.text.strip():
+                slots.append((slide, placeholder))
+    return slots
+
+
+def placeholder_box(placeholder):
+    """Return the (x, y, cx, cy) box of a placeholder, inherited from its layout if needed"""
+    return placeholder.left, placeholder.top, placeholder.width, placeholder.height
+
+
+def remove_shape(shape):
+    """Remove a shape from its slide's shape tree"""
+    element = shape._element
+    element.getparent().remove(element)
+
+
+def remove_chart(slide, chart_shape):
+    """Remove a chart graphic frame and drop its chart part from the slide"""
+    rId = chart_shape._element.chart_rId
+    remove_shape(chart_shape)
+    slide.part.drop_rel(rId)
+
+
+def delete_slide(prs, slide):
+    """Delete a slide by removing it from the slide ID list and dropping its part"""
+    sldIdLst = prs.slides._sldIdLst
+    sldId = list(sldIdLst)[prs.slides.index(slide)]
+    sldIdLst.remove(sldId)
+    prs.part.drop_rel(sldId.rId)
+
+
+# Rows whose label starts with one of these are sample sizes, not chart data
+BASE_ROW_PREFIXES = ("Base",)
+
+
+def clean_sheet_data(df, base_prefixes=BASE_ROW_PREFIXES):
+    """Drop "Base" rows and rows without a label in the first column"""
+    prefixes = tuple(base_prefixes)
+    df = df[~df.iloc[:, 0].map(lambda label: str(label).strip().startswith(prefixes))]
+    return df.dropna(subset=[df.columns[0]])
+
+
+class SheetLayoutDetector:
+    """Finds the tables on a raw sheet (read with header=None) and their header rows.
+    
+    Tables are blocks of rows separated by blank rows; a headerless block with the
+    same columns as the table above it is a spacer inside that table and is merged
+    back into it. Within a block, the rows above the first row holding numbers are
+    headers (rows with only a label cell are taken as the table title instead). A
+    first numeric row of distinct whole numbers lying outside the range of the
+    values below it is a header too when it has no text header above it and does
+    not continue the table above, or when its values look like years. Up to
+    `max_header_rows` header rows are combined into flat column names, with merged
+    (blank) cells in upper header rows filled from the left. The label column is
+    the first column whose data cells are mostly text. Pass `header_rows` to force
+    the number of header rows instead of detecting it.
+    """
+    def __init__(self, max_header_rows=3, header_rows=None, min_data_rows=1,
+                 base_prefixes=BASE_ROW_PREFIXES, header_separator=" - "):
+        self.max_header_rows = max_header_rows
+        self.header_rows = header_rows
+        self.min_data_rows = min_data_rows
+        self.base_prefixes = tuple(base_prefixes)
+        self.header_separator = header_separator
+    
+    def detect(self, raw):
+        """Return a list of tables, each a dict with its layout and parsed DataFrame"""
+        tables = []
+        previous = None  # (block, first_data) of the last table, for spacer rows
+        pending_rows = []  # text-only block that may be the header of the next block
+        for start, stop in self._blocks(raw):
+            block = raw.iloc[start:stop].dropna(axis=1, how='all')
+            numeric = block.apply(pd.to_numeric, errors='coerce')
+            data_rows = [i for i in range(len(block)) if numeric.iloc[i, 1:].notna().any()]
+            
+            if not data_rows:
+                pending_rows = list(range(start, stop))
+                continue
+            
+            continues = not pending_rows and previous is not None and block.shape[1] == previous[0].shape[1]
+            if self.header_rows is not None:
+                first_data = self.header_rows
+            else:
+                first_data = self._first_data_row(block, numeric, data_rows, continues)
+            
+            merged = False
+            if first_data == 0 and pending_rows:
+                # Header separated from its data by a blank row
+                block = raw.iloc[pending_rows[0]:stop]
+                block = block[~block.isna().all(axis=1)].dropna(axis=1, how='all')
+                first_data = len(pending_rows)
+            elif first_data == 0 and continues:
+                # Headerless rows after a spacer row continue the table above
+                block = pd.concat([previous[0], block.set_axis(previous[0].columns, axis=1)])
+                first_data = previous[1]
+                merged = True
+            pending_rows = []
+            
+            table = self._parse_block(block, first_data)
+            if table is None:
+                continue
+            if merged:
+                tables[-1] = table
+            else:
+                tables.append(table)
+            previous = (block, first_data)
+        return tables
+    
+    def _first_data_row(self, block, numeric, data_rows, continues=False):
+        """Index of the first data row, skipping a header of numbers such as years.
+        
+        Ranked data also has its first row outside the range of the rows below, so
+        a numeric row is only a header when its values look like years, or when
+        nothing above it in the block is a text header and it doesn't continue the
+        table above (pass `continues` for blocks that could be spacer-split rows).
+        """
+        first = data_rows[0]
+        below = [i for i in data_rows[1:] if not self._is_base_row(block.iloc[i, 0])]
+        if not below or self._is_base_row(block.iloc[first, 0]):
+            return first
+        
+        values = numeric.iloc[first, 1:].dropna()
+        if not all(float(v).is_integer() for v in values) or values.duplicated().any():
+            return first
+        looks_like_years = values.between(1900, 2100).all()
+        has_text_header = block.iloc[:first, 1:].notna().any(axis=None)
+        if not looks_like_years and (has_text_header or continues):
+            return first
+        body = numeric.iloc[below, 1:]
+        for col, value in values.items():
+            column = body[col].dropna()
+            if column.empty or column.min() <= value <= column.max():
+                return first
+        return first + 1
+    
+    def _is_base_row(self, label):
+        return pd.notna(label) and str(label).strip().startswith(self.base_prefixes)
+    
+    @staticmethod
+    def _blocks(raw):
+        """Yield (start, stop) row ranges separated by fully blank rows"""
+        blank = raw.isna().all(axis=1).tolist()
+        start = None
+        for i, is_blank in enumerate(blank + [True]):
+            if not is_blank and start is None:
+                start = i
+            elif is_blank and start is not None:
+                yield start, i
+                start = None
+    
+    def _parse_block(self, block, first_data):
+        if self.header_rows is not None:
+            header_start = 0
+        else:
+            header_start = max(0, first_data - self.max_header_rows)
+        body = block.iloc[first_data:]
+        if len(body) < self.min_data_rows:
+            return None
+        
+        label_column = self._label_column(body)
+        value_columns = [c for c in range(body.shape[1]) if c != label_column]
+        
+        # Leading rows with nothing outside the label column are titles, not headers
+        title = None
+        while header_start < first_data and block.iloc[header_start, value_columns].isna().all():
+            cell = block.iloc[header_start, label_column]
+            if title is None and pd.notna(cell):
+                title = str(cell).strip()
+            header_start += 1
+        header = block.iloc[header_start:first_data]
+        
+        # Merged cells in upper header rows only have a value in their first column
+        if len(header) > 1:
+            header = pd.concat([header.iloc[:-1].ffill(axis=1), header.iloc[-1:]])
+        
+        names = [self._column_name(header, label_column, "Label")]
+        for position, col in enumerate(value_columns, start=1):
+            names.append(self._column_name(header, col, f"Column {position}"))
+        names = self._dedupe(names)
+        
+        data = body.iloc[:, [label_column] + value_columns].copy()
+        data.columns = names
+        data = data.reset_index(drop=True)
+        
+        return {
+            'header_rows': [int(block.index[i]) for i in range(header_start, first_data)],
+            'first_row': int(block.index[first_data]),
+            'last_row': int(block.index[-1]),
+            'label_column': int(block.columns[label_column]),
+            'title': title,
+            'multi_header': len(header) > 1,
+            'data': data,
+        }
+    
+    @staticmethod
+    def _label_column(body):
+        """First column whose non-empty cells are mostly text"""
+        for col in range(body.shape[1]):
+            values = body.iloc[:, col].dropna()
+            if values.empty:
+                continue
+            text_share = pd.to_numeric(values, errors='coerce').isna().mean()
+            if text_share > 0.5:
+                return col
+        return 0
+    
+    def _column_name(self, header, col, default):
+        parts = []
+        for value in header.iloc[:, col]:
+            if pd.notna(value) and str(value).strip():
+                if isinstance(value, float) and value.is_integer():
+                    value = int(value)
+                text = str(value).strip()
+                if not parts or parts[-1] != text:
+                    parts.append(text)
+        return self.header_separator.join(parts) or default
+    
+    @staticmethod
+    def _dedupe(names):
+        seen = {}
+        unique = []
+        for name in names:
+            count = seen.get(name, 0)
+            seen[name] = count + 1
+            unique.append(name if count == 0 else f"{name} ({count + 1})")
+        return unique
+
+
+def build_chart_data(df, column_indices, column_names, percentage_mode=False,
+                     chart_type_name="Bar Chart", roles=None):
+    """Build the chart data for a sheet and return (chart_data, line_series_count).
+    
+    All selected columns are converted to numbers in one step, then laid out for the
+    chart kind: category series, XY/bubble series sharing the X (and size) column,
+    or combo series ordered columns first and line series last.
+    """
+    kind = chart_kind(chart_type_name)
+    roles = resolve_series_roles(kind, roles, len(column_indices))
+    
+    # Convert all selected columns at once, filling NaN with 0 for charting
+    values = df.iloc[:, list(column_indices)].apply(pd.to_numeric, errors="coerce").fillna(0)
+    
+    # Round to one decimal in percentage mode; XY/bubble charts only plot Y as a percentage
+    if percentage_mode:
+        if kind in ('xy', 'bubble'):
+            y_positions = [i for i, role in enumerate(roles) if role == "Y Values"]
+            values.iloc[:, y_positions] = values.iloc[:, y_positions].round(1)
+        else:
+            values = values.round(1)
+    columns = [values.iloc[:, i].tolist() for i in range(len(column_indices))]
+    
+    if kind in ('xy', 'bubble'):
+        x_values = columns[roles.index("X Values")]
+        if kind == 'xy':
+            chart_data = XyChartData()
+        else:
+            chart_data = BubbleChartData()
+            sizes = columns[roles.index("Bubble Size")]
+        for col_values, col_name, role in zip(columns, column_names, roles):
+            if role != "Y Values":
+                continue
+            series = chart_data.add_series(col_name)
+            for point_idx, (x, y) in enumerate(zip(x_values, col_values)):
+                if kind == 'xy':
+                    series.add_data_point(x, y)
+                else:
+                    series.add_data_point(x, y, sizes[point_idx])
+        return chart_data, 0
+    
+    chart_data = CategoryChartData()
+    chart_data.categories = df.iloc[:, 0].astype(str).tolist()
+    
+    # Combo line series go last so they can be split off into the line plot
+    order = sorted(range(len(roles)), key=lambda i: roles[i] == "Line (Secondary Axis)")
+    for i in order:
+        chart_data.add_series(column_names[i], columns[i])
+    line_series_count = roles.count("Line (Secondary Axis)")
+    
+    return chart_data, line_series_count
+
+
+# Axis IDs for the secondary axes added to combo charts
+SECONDARY_CATEGORY_AXIS_ID = 90000001
+SECONDARY_VALUE_AXIS_ID = 90000002
+
+
+def make_combo_chart(chart, line_series_count):
+    """Move the last `line_series_count` series of a column chart into a line plot
+    drawn against a secondary value axis"""
+    if not line_series_count:
+        return
+    plot_area = chart._chartSpace.chart.plotArea
+    bar_chart = plot_area.find(qn('c:barChart'))
+    line_sers = bar_chart.findall(qn('c:ser'))[-line_series_count:]
+    
+    line_chart = parse_xml(
+        f'<c:lineChart {nsdecls("c")}><c:grouping val="standard"/><c:varyColors val="0"/>'
+        f'<c:marker val="1"/>'
+        f'<c:axId val="{SECONDARY_CATEGORY_AXIS_ID}"/><c:axId val="{SECONDARY_VALUE_AXIS_ID}"/>'
+        f'</c:lineChart>'
+    )
+    marker = line_chart.find(qn('c:marker'))
+    for ser in line_sers:
+        # Bar-only elements are not valid in a line series
+        for tag in ('c:invertIfNegative', 'c:shape'):
+            for child in ser.findall(qn(tag)):
+                ser.remove(child)
+        marker.addprevious(ser)
+    bar_chart.addnext(line_chart)
+    
+    # Hidden secondary category axis plus a visible value axis on the right
+    axes = parse_xml(
+        f'<c:axes {nsdecls("c")}>'
+        f'<c:catAx><c:axId val="{SECONDARY_CATEGORY_AXIS_ID}"/>'
+        f'<c:scaling><c:orientation val="minMax"/></c:scaling><c:delete val="1"/>'
+        f'<c:axPos val="b"/><c:majorTickMark val="out"/><c:minorTickMark val="none"/>'
+        f'<c:tickLblPos val="nextTo"/><c:crossAx val="{SECONDARY_VALUE_AXIS_ID}"/>'
+        f'<c:crosses val="autoZero"/><c:auto val="1"/><c:lblAlgn val="ctr"/>'
+        f'<c:lblOffset val="100"/><c:noMultiLvlLbl val="0"/></c:catAx>'
+        f'<c:valAx><c:axId val="{SECONDARY_VALUE_AXIS_ID}"/>'
+        f'<c:scaling><c:orientation val="minMax"/></c:scaling><c:delete val="0"/>'
+        f'<c:axPos val="r"/><c:numFmt formatCode="General" sourceLinked="1"/>'
+        f'<c:majorTickMark val="out"/><c:minorTickMark val="none"/><c:tickLblPos val="nextTo"/>'
+        f'<c:crossAx val="{SECONDARY_CATEGORY_AXIS_ID}"/><c:crosses val="max"/>'
+        f'<c:crossBetween val="between"/></c:valAx>'
+        f'</c:axes>'
+    )
+    last_axis = plot_area.xpath('./c:catAx | ./c:valAx | ./c:dateAx | ./c:serAx')[-1]
+    for axis in reversed(list(axes)):
+        last_axis.addnext(axis)
+
+
+def move_slides(prs, count, index):
+    """Move the last `count` slides so they start at `index` by reordering the slide ID list"""
+    sldIdLst = prs.slides._sldIdLst
+    moved = list(sldIdLst)[len(sldIdLst) - count:]
+    for offset, sldId in enumerate(moved):
+        sldIdLst.remove(sldId)
+        sldIdLst.insert(index + offset, sldId)
+
+
+def prune_unused_layouts(prs):
+    """Drop slide layouts no slide uses, then masters left without layouts.
+    
+    Returns the number of layouts and masters removed. Decks without slides are
+    left untouched so the template stays usable.
+    """
+    if len(prs.slides) == 0:
+        return 0, 0
+    
+    removed_layouts = 0
+    for master in prs.slide_masters:
+        for layout in list(master.slide_layouts):
+            if not layout.used_by_slides:
+                master.slide_layouts.remove(layout)
+                removed_layouts += 1
+    
+    removed_masters = 0
+    sldMasterIdLst = prs._element.sldMasterIdLst
+    for sldMasterId in list(sldMasterIdLst):
+        master_part = prs.part.related_part(sldMasterId.rId)
+        if len(master_part.slide_master.slide_layouts) == 0:
+            sldMasterIdLst.remove(sldMasterId)
+            prs.part.drop_rel(sldMasterId.rId)
+            removed_masters += 1
+    
+    return removed_layouts, removed_masters
+
+
+# Part types that are already compressed; deflating them again rarely pays off
+PRECOMPRESSED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.tif', '.tiff', '.mp3', '.mp4', '.m4a', '.wmv',
+    '.xlsx', '.xlsm', '.docx', '.pptx', '.zip',
+}
+# Shared binaries that may be repeated across the package
+DEDUPLICATED_FOLDERS = ('ppt/media/', 'ppt/embeddings/')
+XML_COMPRESS_LEVEL = 9
+BINARY_COMPRESS_LEVEL = 6
+
+
+def _rels_source_dir(rels_name):
+    """Directory of the part that a .rels file belongs to"""
+    return posixpath.dirname(posixpath.dirname(rels_name))
+
+
+def compact_pptx(path):
+    """Rewrite a saved .pptx with duplicate media/embeddings merged and tuned compression.
+    
+    Identical parts under ppt/media and ppt/embeddings are collapsed onto the
+    first copy and every relationship pointing at a duplicate is retargeted. XML
+    parts are deflated at the highest level; already-compressed parts are only
+    deflated when that actually makes them smaller. Returns a dict of stats.
+    """
+    size_before = os.path.getsize(path)
+    with zipfile.ZipFile(path) as source:
+        infos = source.infolist()
+        parts = {info.filename: source.read(info.filename) for info in infos}
+    
+    # Map duplicate part names onto the first part with the same content
+    canonical = {}
+    duplicates = {}
+    for name, data in parts.items():
+        if not name.startswith(DEDUPLICATED_FOLDERS):
+            continue
+        digest = hashlib.sha1(data).hexdigest()
+        if digest in canonical:
+            duplicates[name] = canonical[digest]
+        else:
+            canonical[digest] = name
+    
+    if duplicates:
+        for name in list(parts):
+            if name.endswith('.rels'):
+                parts[name] = _retarget_rels(parts[name], _rels_source_dir(name), duplicates)
+        parts['[Content_Types].xml'] = _drop_content_type_overrides(parts['[Content_Types].xml'], duplicates)
+        for name in duplicates:
+            del parts[name]
+    
+    temp_path = path + ".tmp"
+    with zipfile.ZipFile(temp_path, 'w') as target:
+        # Keep the original entry order
+        for info in infos:
+            if info.filename not in parts:
+                continue
+            data = parts[info.filename]
+            extension = posixpath.splitext(info.filename)[1].lower()
+            if extension in PRECOMPRESSED_EXTENSIONS:
+                level = BINARY_COMPRESS_LEVEL
+                deflated_size = len(zlib.compress(data, level))
+                compress_type = zipfile.ZIP_DEFLATED if deflated_size < len(data) else zipfile.ZIP_STORED
+            else:
+                level = XML_COMPRESS_LEVEL
+                compress_type = zipfile.ZIP_DEFLATED
+            target.writestr(info.filename, data, compress_type=compress_type, compresslevel=level)
+    os.replace(temp_path, path)
+    
+    return {
+        'size_before': size_before,
+        'size_after': os.path.getsize(path),
+        'duplicates_removed': len(duplicates),
+    }
+
+
+def _retarget_rels(rels_xml, source_dir, duplicates):
+    """Point relationships at duplicate parts to their canonical copy"""
+    root = parse_xml(rels_xml)
+    changed = False
+    for rel in root:
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = rel.get('Target', '')
+        if target.startswith('/'):
+            resolved = posixpath.normpath(target[1:])
+        else:
+            resolved = posixpath.normpath(posixpath.join(source_dir, target))
+        if resolved in duplicates:
+            if target.startswith('/'):
+                rel.set('Target', '/' + duplicates[resolved])
+            else:
+                rel.set('Target', posixpath.relpath(duplicates[resolved], source_dir or '.'))
+            changed = True
+    if not changed:
+        return rels_xml
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def _drop_content_type_overrides(content_types_xml, removed_parts):
+    """Remove [Content_Types].xml overrides for parts that no longer exist"""
+    root = parse_xml(content_types_xml)
+    removed = {f"/{name}" for name in removed_parts}
+    for override in list(root):
+        if override.get('PartName') in removed:
+            root.remove(override)
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+class ChartTheme:
+    """Declarative description of how generated charts should look"""
+    def __init__(self, series_colors=None, axis_font_size=10, legend_font_size=9,
+                 data_label_font_size=9, line_width=2.5, gap_width=50,
+                 number_format='0.0', percentage_format='0.0"%"'):
+        self.series_colors = list(series_colors or SERIES_COLORS)
+        self.axis_font_size = axis_font_size
+        self.legend_font_size = legend_font_size
+        self.data_label_font_size = data_label_font_size
+        self.line_width = line_width
+        self.gap_width = gap_width
+        self.number_format = number_format
+        self.percentage_format = percentage_format
+
+
+DEFAULT_THEME = ChartTheme()
+
+
+class ChartStyleEngine:
+    """Applies a precompiled style bundle per chart type straight to the chart XML.
+
+    Bundles are built once per (chart type, percentage mode, multi-series) from the
+    theme and then copied into each chart in a single pass, instead of setting
+    every property through the python-pptx proxies.
+    """
+    def __init__(self, theme=None):
+        self.theme = theme or DEFAULT_THEME
+        self._bundles = {}
+        self.timings = {}  # chart type name -> list of seconds spent formatting
+    
+    @staticmethod
+    def _txPr(font_size):
+        return (
+            f'<c:txPr {nsdecls("c", "a")}><a:bodyPr/><a:lstStyle/>'
+            f'<a:p><a:pPr><a:defRPr sz="{int(font_size * 100)}"/></a:pPr>'
+            f'<a:endParaRPr lang="en-US"/></a:p></c:txPr>'
+        )
+    
+    def _fill(self, color, line=False):
+        solid = f'<a:solidFill><a:srgbClr val="{color}"/></a:solidFill>'
+        outline = ''
+        if line:
+            outline = f'<a:ln w="{Pt(self.theme.line_width)}">{solid}</a:ln>'
+        return parse_xml(f'<c:spPr {nsdecls("c", "a")}>{solid}{outline}</c:spPr>')
+    
+    @staticmethod
+    def _marker(color):
+        solid = f'<a:solidFill><a:srgbClr val="{color}"/></a:solidFill>'
+        return parse_xml(
+            f'<c:marker {nsdecls("c", "a")}><c:symbol val="circle"/><c:size val="7"/>'
+            f'<c:spPr>{solid}<a:ln><a:noFill/></a:ln></c:spPr></c:marker>'
+        )
+    
+    def _dLbls(self, number_format, show_value, show_percent, leader_lines):
+        num_fmt = ''
+        if number_format:
+            num_fmt = f'<c:numFmt formatCode={quoteattr(number_format)} sourceLinked="0"/>'
+        leader = '<c:showLeaderLines val="1"/>' if leader_lines else ''
+        return parse_xml(
+            f'<c:dLbls {nsdecls("c", "a")}>{num_fmt}'
+            f'{self._txPr(self.theme.data_label_font_size)}'
+            f'<c:showLegendKey val="0"/><c:showVal val="{int(show_value)}"/>'
+            f'<c:showCatName val="0"/><c:showSerName val="0"/>'
+            f'<c:showPercent val="{int(show_percent)}"/><c:showBubbleSize val="0"/>'
+            f'{leader}</c:dLbls>'
+        )
+    
+    @staticmethod
+    def _replace_dLbls(plot, dLbls):
+        """Swap a plot's data labels, keeping them in schema order for every plot kind"""
+        if plot.tag in SER_ANCHORED_DLBLS_PLOTS:
+            for old in plot.xpath('./c:dLbls'):
+                plot.remove(old)
+            plot.sers[-1].addnext(dLbls)
+        else:
+            plot._remove_dLbls()
+            plot._insert_dLbls(dLbls)
+    
+    def bundle(self, chart_type, percentage_mode=False, multi_series=False):
+        """Return the cached style bundle for a chart type, compiling it on first use"""
+        key = (chart_type, bool(percentage_mode), bool(multi_series))
+        if key in self._bundles:
+            return self._bundles[key]
+        
+        theme = self.theme
+        is_pie = chart_type in PIE_CHART_TYPES
+        bundle = {
+            'pie': is_pie,
+            'fills': [self._fill(color) for color in theme.series_colors],
+            'line_fills': [self._fill(color, line=True) for color in theme.series_colors],
+            'markers': [self._marker(color) for color in theme.series_colors],
+            'scatter_spPr': parse_xml(f'<c:spPr {nsdecls("c", "a")}><a:ln><a:noFill/></a:ln></c:spPr>'),
+            'gap_width': theme.gap_width if chart_type in BAR_CHART_TYPES else None,
+            'axis_txPr': None,
+            'axis_number_format': None,
+            'dLbls': None,
+        }
+        
+        if is_pie:
+            bundle['legend'] = (XL_LEGEND_POSITION.RIGHT, None)
+            if percentage_mode:
+                bundle['dLbls'] = self._dLbls(theme.percentage_format, True, False, True)
+            else:
+                bundle['dLbls'] = self._dLbls(None, False, True, True)
+        else:
+            if multi_series:
+                bundle['legend'] = (XL_LEGEND_POSITION.BOTTOM,
+                                    parse_xml(self._txPr(theme.legend_font_size)))
+            else:
+                bundle['legend'] = None
+                number_format = theme.percentage_format if percentage_mode else theme.number_format
+                bundle['dLbls'] = self._dLbls(number_format, True, False, False)
+            bundle['axis_txPr'] = parse_xml(self._txPr(theme.axis_font_size))
+            if percentage_mode:
+                bundle['axis_number_format'] = theme.percentage_format
+        
+        self._bundles[key] = bundle
+        return bundle
+    
+    def apply(self, chart, chart_type, percentage_mode=False, series_count=1, chart_type_name=None):
+        """Style a python-pptx chart in one pass over its XML.
+        
+        Timings are keyed by `chart_type_name` because several UI names share an
+        XL_CHART_TYPE (e.g. "Column Chart" and "Column + Line").
+        """
+        start = time.perf_counter()
+        bundle = self.bundle(chart_type, percentage_mode, series_count > 1)
+        chart_el = chart._chartSpace.chart
+        plot_area = chart_el.plotArea
+        
+        # Legend
+        if bundle['legend'] is None:
+            chart_el.has_legend = False
+        else:
+            position, legend_txPr = bundle['legend']
+            chart_el.has_legend = True
+            legend = chart_el.legend
+            legend.get_or_add_legendPos().val = position
+            if legend_txPr is not None:
+                legend._remove_txPr()
+                legend._insert_txPr(deepcopy(legend_txPr))
+        
+        # Axes: no gridlines, themed tick label fonts and number format
+        if bundle['axis_txPr'] is not None:
+            for axis in plot_area.xpath('./c:catAx | ./c:valAx | ./c:dateAx'):
+                axis._remove_majorGridlines()
+                axis._remove_minorGridlines()
+                axis._remove_txPr()
+                axis._insert_txPr(deepcopy(bundle['axis_txPr']))
+                if bundle['axis_number_format'] and axis.tag.endswith('}valAx'):
+                    # XY/bubble X values sit on a horizontal valAx; only the vertical one is a percentage
+                    if chart_type in XY_CHART_TYPES and axis.xpath('./c:axPos/@val') not in (['l'], ['r']):
+                        continue
+                    num_fmt = axis.get_or_add_numFmt()
+                    num_fmt.set('formatCode', bundle['axis_number_format'])
+                    num_fmt.set('sourceLinked', '0')
+        
+        # Plots and their series; combo charts mix bar and line plots
+        for plot in plot_area.iter_xCharts():
+            if bundle['gap_width'] is not None and plot.tag == qn('c:barChart'):
+                plot.get_or_add_gapWidth().val = bundle['gap_width']
+            
+            fills = bundle['line_fills'] if plot.tag == qn('c:lineChart') else bundle['fills']
+            scatter = plot.tag == qn('c:scatterChart')
+            
+            if bundle['dLbls'] is not None:
+                self._replace_dLbls(plot, deepcopy(bundle['dLbls']))
+            
+            for ser in plot.sers:
+                if bundle['pie']:
+                    # Pie/doughnut charts colour each point rather than the series
+                    for point_idx in range(ser.cat_ptCount_val):
+                        dPt = ser.get_or_add_dPt_for_point(point_idx)
+                        dPt._remove_spPr()
+                        dPt._insert_spPr(deepcopy(fills[point_idx % len(fills)]))
+                elif scatter:
+                    # Scatter series show coloured markers without connecting lines
+                    markers = bundle['markers']
+                    ser._remove_spPr()
+                    ser._insert_spPr(deepcopy(bundle['scatter_spPr']))
+                    ser._remove_marker()
+                    ser._insert_marker(deepcopy(markers[ser.idx.val % len(markers)]))
+                else:
+                    ser._remove_spPr()
+                    ser._insert_spPr(deepcopy(fills[ser.idx.val % len(fills)]))
+        
+        if chart_type_name is None:
+            # First registered name wins for chart types shared by several names
+            chart_type_name = next((k for k, v in CHART_TYPES.items() if v == chart_type), str(chart_type))
+        self.timings.setdefault(chart_type_name, []).append(time.perf_counter() - start)
+    
+    def timing_report(self):
+        """Summarise formatting cost per chart type, slowest first"""
+        lines = []
+        totals = sorted(self.timings.items(), key=lambda item: sum(item[1]), reverse=True)
+        for chart_type_name, samples in totals:
+            total_ms = sum(samples) * 1000
+            lines.append(f"{chart_type_name}: {len(samples)} charts, "
+                         f"{total_ms:.1f} ms total, {total_ms / len(samples):.2f} ms avg")
+        return "\n".join(lines)
+
+# Thumbnail previews
+THUMBNAIL_SIZE = (80, 45)
+PREVIEW_SIZE = (480, 270)
+THUMBNAIL_MAX_CATEGORIES = 12
+THUMBNAIL_MAX_POINTS = 50
+
+
+def hash_sheet_data(df):
+    """Stable content hash of a sheet's cleaned data, used to key preview thumbnails"""
+    row_hashes = pd.util.hash_pandas_object(df, index=True).values
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()
+
+
+def thumbnail_primitives(chart_type_name, categories, series_values, colors, line_series_count=0):
+    """Compute the drawing primitives for a chart thumbnail.
+    
+    Coordinates are normalised to the unit square so one cached list can be drawn at
+    any size. Each primitive is (kind, coords, fill) with kind one of "rect", "line",
+    "polygon", "arc" or "oval"; arcs carry (start, extent) after the bounding box.
+    For combo charts the last `line_series_count` series are drawn as lines on their
+    own scale over the columns.
+    """
+    primitives = []
+    n = min(len(categories), THUMBNAIL_MAX_CATEGORIES)
+    series_values = [[v if math.isfinite(v) else 0.0 for v in values[:n]] for values in series_values]
+    if n == 0 or not series_values:
+        return primitives
+    
+    if line_series_count:
+        bar_values = series_values[:-line_series_count]
+        primitives = thumbnail_primitives(chart_type_name, categories, bar_values, colors)
+        line_values = series_values[-line_series_count:]
+        flat = [v for values in line_values for v in values]
+        low, high = min(flat), max(flat)
+        span = (high - low) or 1.0
+        if n > 1:
+            for s_idx, values in enumerate(line_values, start=len(bar_values)):
+                points = []
+                for i, value in enumerate(values):
+                    points.extend(((i + 0.5) / n, 0.95 - 0.9 * (value - low) / span))
+                primitives.append(("line", tuple(points), colors[s_idx % len(colors)]))
+        return primitives
+    
+    chart_type = CHART_TYPES.get(chart_type_name)
+    
+    if chart_type in PIE_CHART_TYPES:
+        values = [max(v, 0.0) for v in series_values[0]]
+        total = sum(values)
+        if total <= 0:
+            return primitives
+        start = 90.0
+        for i, value in enumerate(values):
+            extent = -360.0 * value / total
+            primitives.append(("arc", (0.2, 0.02, 0.8, 0.98, start, extent), colors[i % len(colors)]))
+            start += extent
+        if chart_type == XL_CHART_TYPE.DOUGHNUT:
+            primitives.append(("oval", (0.35, 0.29, 0.65, 0.71), "#FFFFFF"))
+        return primitives
+    
+    stacked = chart_type in (XL_CHART_TYPE.BAR_STACKED, XL_CHART_TYPE.COLUMN_STACKED)
+    horizontal = chart_type in (XL_CHART_TYPE.BAR_CLUSTERED, XL_CHART_TYPE.BAR_STACKED)
+    
+    if stacked:
+        series_values = [[max(v, 0.0) for v in values] for values in series_values]
+        low, high = 0.0, max(sum(column) for column in zip(*series_values))
+    else:
+        flat = [v for values in series_values for v in values]
+        low, high = min(0.0, min(flat)), max(0.0, max(flat))
+    span = (high - low) or 1.0
+    
+    def scale(value):
+        return (value - low) / span
+    
+    baseline = scale(0.0)
+    slot = 1.0 / n
+    
+    if chart_type in LINE_CHART_TYPES or chart_type == XL_CHART_TYPE.AREA:
+        for s_idx, values in enumerate(series_values):
+            points = []
+            for i, value in enumerate(values):
+                points.extend((slot * (i + 0.5), 1.0 - scale(value)))
+            color = colors[s_idx % len(colors)]
+            if chart_type == XL_CHART_TYPE.AREA:
+                polygon = [slot * 0.5, 1.0 - baseline] + points + [slot * (n - 0.5), 1.0 - baseline]
+                primitives.append(("polygon", tuple(polygon), color))
+            elif n > 1:
+                primitives.append(("line", tuple(points), color))
+        return primitives
+    
+    # Bar/column charts, clustered or stacked
+    bar_span = slot * 0.7
+    offsets = [0.0] * n
+    for s_idx, values in enumerate(series_values):
+        color = colors[s_idx % len(colors)]
+        for i, value in enumerate(values):
+            if stacked:
+                start, end = offsets[i], offsets[i] + scale(value)
+                offsets[i] = end
+                lo, hi = slot * i + (slot - bar_span) / 2, slot * i + (slot + bar_span) / 2
+            else:
+                start, end = sorted((baseline, scale(value)))
+                width = bar_span / len(series_values)
+                lo = slot * i + (slot - bar_span) / 2 + width * s_idx
+                hi = lo + width
+            if horizontal:
+                primitives.append(("rect", (start, lo, end, hi), color))
+            else:
+                primitives.append(("rect", (lo, 1.0 - end, hi, 1.0 - start), color))
+    return primitives
+
+
+def xy_thumbnail_primitives(series_points, colors):
+    """Thumbnail primitives for XY scatter and bubble charts.
+    
+    `series_points` holds (x_values, y_values, bubble_sizes) per series, with empty
+    sizes for scatter charts. Points are drawn as ovals in the unit square.
+    """
+    primitives = []
+    series_points = [(xs[:THUMBNAIL_MAX_POINTS], ys[:THUMBNAIL_MAX_POINTS], sizes[:THUMBNAIL_MAX_POINTS])
+                     for xs, ys, sizes in series_points]
+    all_x = [x for xs, _, _ in series_points for x in xs if math.isfinite(x)]
+    all_y = [y for _, ys, _ in series_points for y in ys if math.isfinite(y)]
+    if not all_x or not all_y:
+        return primitives
+    all_sizes = [abs(size) for _, _, sizes in series_points for size in sizes if math.isfinite(size)]
+    max_size = max(all_sizes) if all_sizes else 0
+    
+    x_low, x_span = min(all_x), (max(all_x) - min(all_x)) or 1.0
+    y_low, y_span = min(all_y), (max(all_y) - min(all_y)) or 1.0
+    for s_idx, (xs, ys, sizes) in enumerate(series_points):
+        color = colors[s_idx % len(colors)]
+        for i, (x, y) in enumerate(zip(xs, ys)):
+            if not (math.isfinite(x) and math.isfinite(y)):
+                continue
+            radius = 0.03
+            if sizes and max_size and math.isfinite(sizes[i]):
+                radius = 0.02 + 0.1 * math.sqrt(abs(sizes[i]) / max_size)
+            cx = 0.1 + 0.8 * (x - x_low) / x_span
+            cy = 0.9 - 0.8 * (y - y_low) / y_span
+            primitives.append(("oval", (cx - radius, cy - radius, cx + radius, cy + radius), color))
+    return primitives
+
+
+def draw_thumbnail(canvas, primitives, width, height, pad=2):
+    """Draw cached thumbnail primitives onto a Tk canvas of the given size"""
+    canvas.delete("all")
+    inner_w, inner_h = width - 2 * pad, height - 2 * pad
+    
+    def to_canvas(coords):
+        return [pad + (c * inner_w if k % 2 == 0 else c * inner_h) for k, c in enumerate(coords)]
+    
+    for kind, coords, fill in primitives:
+        if kind == "rect":
+            canvas.create_rectangle(*to_canvas(coords), fill=fill, outline="")
+        elif kind == "line":
+            canvas.create_line(*to_canvas(coords), fill=fill, width=2)
+        elif kind == "polygon":
+            canvas.create_polygon(*to_canvas(coords), fill=fill, outline="")
+        elif kind == "arc":
+            canvas.create_arc(*to_canvas(coords[:4]), start=coords[4], extent=coords[5],
+                              fill=fill, outline="white")
+        elif kind == "oval":
+            canvas.create_oval(*to_canvas(coords), fill=fill, outline="")
+
+
 class ChartConfigUI:
     def __init__(self, root):
         self.root = root
@@ -51,6 +1020,9 @@ class ChartConfigUI:
         self.template_path = tk.StringVar(value=template_ppt)
         self.output_path = tk.StringVar(value=output_ppt)
         self.starting_slide = tk.IntVar(value=3)
+        self.charts_per_slide = tk.IntVar(value=1)
+        self.fill_template_slides = tk.BooleanVar(value=False)
+        self.optimize_output = tk.BooleanVar(value=False)
         
         # Chart selections and sheet info
         self.chart_selections = {}
@@ -60,6 +1032,25 @@ class ChartConfigUI:
         self.valid_sheets = []
         self.all_sheets_info = []
         
+        # Per-sheet failures from the last run, and where a retry should insert its slides
+        self.failure_report = []
+        self.retry_insert_index = None
+        self.slide_layout_name = None
+        
+        # Size savings from the optional output optimisation stage
+        self.optimization_report = None
+        
+        # Cleaned sheet data and thumbnail cache for chart previews
+        self.sheet_data = {}
+        self.preview_canvases = {}
+        self.thumbnail_cache = {}
+        
+        # Sheet layout detection, run once per sheet when the workbook is analysed
+        self.layout_detector = SheetLayoutDetector()
+        
+        # Chart styling
+        self.style_engine = ChartStyleEngine(DEFAULT_THEME)
+        
         self.setup_ui()
         self.load_excel_info()
         
@@ -121,6 +1112,16 @@ class ChartConfigUI:
         
         ttk.Label(config_frame, text="Starting Slide Number:").pack(side=tk.LEFT, padx=(0, 5))
         ttk.Spinbox(config_frame, from_=1, to=100, textvariable=self.starting_slide, width=5).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(config_frame, text="Charts per Slide:").pack(side=tk.LEFT, padx=(0, 5))
+        grid_combo = ttk.Combobox(config_frame, textvariable=self.charts_per_slide, values=list(GRID_LAYOUTS.keys()),
+                                  state="readonly", width=3)
+        grid_combo.pack(side=tk.LEFT, padx=(0, 10))
+        grid_combo.bind("<<ComboboxSelected>>", lambda e: self.update_slide_numbers())
+        ttk.Checkbutton(config_frame, text="Fill template placeholders", 
+                        variable=self.fill_template_slides).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Checkbutton(config_frame, text="Optimise output size", 
+                        variable=self.optimize_output).pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(config_frame, text="🔄 Refresh Excel Data", command=self.load_excel_info).pack(side=tk.LEFT, padx=10)
         
         # Info section
@@ -167,6 +1168,8 @@ class ChartConfigUI:
         
         ttk.Button(button_frame, text="🚀 Generate PowerPoint", command=self.generate_ppt, 
                   style="Accent.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="🔁 Retry Failed Sheets", command=self.retry_failed_sheets).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="⏱ Formatting Cost", command=self.show_formatting_cost).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="❌ Exit", command=self.root.quit).pack(side=tk.LEFT, padx=5)
         
         # Bind mousewheel to canvas
@@ -206,57 +1209,34 @@ class ChartConfigUI:
                 self.info_label.config(text="❌ Excel file not found")
                 return
             
-            # Load all Excel sheets
-            sheets = pd.read_excel(self.excel_path.get(), sheet_name=None, header=2)
+            # Load all Excel sheets raw; the layout detector finds the headers
+            sheets = pd.read_excel(self.excel_path.get(), sheet_name=None, header=None)
             
             # Analyze all sheets
             self.all_sheets_info = []
             self.valid_sheets = []
+            self.sheet_data = {}
             
-            for sheet_name, df in sheets.items():
-                sheet_info = {
-                    'name': sheet_name,
-                    'total_rows': len(df),
-                    'total_columns': len(df.columns),
-                    'is_valid': False,
-                    'valid_rows': 0,
-                    'has_numeric_data': False,
-                    'column_names': list(df.columns) if not df.empty else [],
-                    'numeric_columns': []
-                }
+            for sheet_name, raw in sheets.items():
+                tables = self.layout_detector.detect(raw)
+                if not tables:
+                    self.all_sheets_info.append(self.analyze_table(sheet_name, sheet_name, None))
+                    continue
                 
-                if not df.empty and len(df.columns) >= 2:
-                    # Test data cleaning process
-                    test_df = df.copy()
-                    test_df = test_df[~test_df.iloc[:, 0].astype(str).str.startswith("Base")]
-                    test_df = test_df.dropna(subset=[test_df.columns[0]])
-                    
-                    # Find all numeric columns (skip first column which is labels)
-                    numeric_columns = []
-                    for col_idx in range(1, len(df.columns)):
-                        col_data = pd.to_numeric(test_df.iloc[:, col_idx], errors='coerce')
-                        if col_data.notna().sum() > 0:
-                            numeric_columns.append({
-                                'index': col_idx,
-                                'name': str(df.columns[col_idx]),
-                                'valid_count': col_data.notna().sum()
-                            })
-                    
-                    if numeric_columns and not test_df.empty:
-                        sheet_info['is_valid'] = True
-                        sheet_info['valid_rows'] = len(test_df)
-                        sheet_info['has_numeric_data'] = True
-                        sheet_info['numeric_columns'] = numeric_columns
-                        self.valid_sheets.append(sheet_name)
-                
-                self.all_sheets_info.append(sheet_info)
+                # Extra tables on the same sheet get their own catalog entry
+                for table_idx, table in enumerate(tables):
+                    name = sheet_name if table_idx == 0 else f"{sheet_name} [{table_idx + 1}]"
+                    self.all_sheets_info.append(self.analyze_table(name, sheet_name, table))
             
             # Update info display
             total_sheets = len(sheets)
             valid_sheets_count = len(self.valid_sheets)
+            table_count = sum(1 for s in self.all_sheets_info if s['layout'])
+            multi_header_count = sum(1 for s in self.all_sheets_info if s['layout'] and s['layout']['multi_header'])
             
             info_text = f"📊 Excel Analysis Results:\n"
-            info_text += f"   • Total sheets found: {total_sheets}\n"
+            info_text += f"   • Total sheets found: {total_sheets} ({table_count} tables, "
+            info_text += f"{multi_header_count} with multi-level headers)\n"
             info_text += f"   • Sheets with valid chart data: {valid_sheets_count}\n"
             info_text += f"   • Charts will start from slide: {self.starting_slide.get()}\n"
             
@@ -273,11 +1253,58 @@ class ChartConfigUI:
         except Exception as e:
             self.info_label.config(text=f"❌ Error analyzing Excel file: {str(e)}")
     
+    def analyze_table(self, name, sheet_name, table):
+        """Build the catalog entry for one detected table, storing its cleaned data"""
+        df = table['data'] if table else pd.DataFrame()
+        sheet_info = {
+            'name': name,
+            'sheet': sheet_name,
+            'layout': {k: v for k, v in table.items() if k != 'data'} if table else None,
+            'total_rows': len(df),
+            'total_columns': len(df.columns),
+            'is_valid': False,
+            'valid_rows': 0,
+            'has_numeric_data': False,
+            'column_names': list(df.columns) if not df.empty else [],
+            'numeric_columns': []
+        }
+        
+        if not df.empty and len(df.columns) >= 2:
+            # Test data cleaning process
+            test_df = clean_sheet_data(df, self.layout_detector.base_prefixes)
+            
+            # Find all numeric columns (skip first column which is labels)
+            numeric_columns = []
+            for col_idx in range(1, len(df.columns)):
+                col_data = pd.to_numeric(test_df.iloc[:, col_idx], errors='coerce')
+                if col_data.notna().sum() > 0:
+                    numeric_columns.append({
+                        'index': col_idx,
+                        'name': str(df.columns[col_idx]),
+                        'valid_count': col_data.notna().sum()
+                    })
+            
+            if numeric_columns and not test_df.empty:
+                sheet_info['is_valid'] = True
+                sheet_info['valid_rows'] = len(test_df)
+                sheet_info['has_numeric_data'] = True
+                sheet_info['numeric_columns'] = numeric_columns
+                sheet_info['data_hash'] = hash_sheet_data(test_df)
+                self.sheet_data[name] = test_df
+                self.valid_sheets.append(name)
+        
+        return sheet_info
+    
     def open_series_selector(self, sheet_name, sheet_info):
-        """Open a dialog to select multiple series for a sheet"""
+        """Open a dialog to select multiple series for a sheet, and their roles for
+        XY, bubble and combo charts"""
+        chart_var = self.chart_selections.get(sheet_name)
+        chart_type_name = chart_var.get() if chart_var else "Bar Chart"
+        kind = chart_kind(chart_type_name)
+        
         dialog = tk.Toplevel(self.root)
         dialog.title(f"Select Data Series - {sheet_name}")
-        dialog.geometry("500x400")
+        dialog.geometry("500x400" if kind == 'category' else "500x560")
         dialog.transient(self.root)
         dialog.grab_set()
         
@@ -315,23 +1342,57 @@ class ChartConfigUI:
         helper_frame = ttk.Frame(dialog)
         helper_frame.pack(pady=5)
         
-        ttk.Button(helper_frame, text="Select All", 
-                  command=lambda: listbox.selection_set(0, tk.END)).pack(side=tk.LEFT, padx=5)
-        ttk.Button(helper_frame, text="Clear All", 
-                  command=lambda: listbox.selection_clear(0, tk.END)).pack(side=tk.LEFT, padx=5)
+        def select_all():
+            listbox.selection_set(0, tk.END)
+            update_selection_info()
+        
+        def clear_all():
+            listbox.selection_clear(0, tk.END)
+            update_selection_info()
+        
+        ttk.Button(helper_frame, text="Select All", command=select_all).pack(side=tk.LEFT, padx=5)
+        ttk.Button(helper_frame, text="Clear All", command=clear_all).pack(side=tk.LEFT, padx=5)
         
         # Selection info
         selection_label = ttk.Label(dialog, text="", foreground="gray")
         selection_label.pack(pady=5)
         
+        # Series roles (XY, bubble and combo charts only)
+        roles_frame = ttk.LabelFrame(dialog, text=f"Series Roles - {chart_type_name}", padding="5")
+        if kind != 'category':
+            roles_frame.pack(fill=tk.X, padx=10, pady=5)
+        role_vars = {}  # column index -> StringVar
+        saved = self.column_selections.get(sheet_name) or {}
+        saved_roles = dict(zip(saved.get('indices', []), saved.get('roles') or []))
+        
+        def refresh_roles():
+            for widget in roles_frame.winfo_children():
+                widget.destroy()
+            selected = listbox.curselection()
+            defaults = default_series_roles(kind, len(selected))
+            for position, idx in enumerate(selected):
+                col = sheet_info['numeric_columns'][idx]
+                if col['index'] not in role_vars:
+                    role = saved_roles.get(col['index'])
+                    if role not in SERIES_ROLES[kind]:
+                        role = defaults[position]
+                    role_vars[col['index']] = tk.StringVar(value=role)
+                ttk.Label(roles_frame, text=col['name'][:40], width=40).grid(row=position, column=0, sticky=tk.W)
+                ttk.Combobox(roles_frame, textvariable=role_vars[col['index']], values=SERIES_ROLES[kind],
+                             state="readonly", width=22).grid(row=position, column=1, padx=5, pady=1)
+        
         def update_selection_info():
             count = len(listbox.curselection())
             if count == 0:
                 selection_label.config(text="⚠️ Please select at least one column")
+            elif kind != 'category':
+                selection_label.config(text=f"✓ {count} columns - needs {ROLE_REQUIREMENTS[kind]}")
             elif count == 1:
                 selection_label.config(text="✓ Single series chart")
             else:
                 selection_label.config(text=f"✓ Multi-series chart ({count} series)")
+            if kind != 'category':
+                refresh_roles()
         
         listbox.bind('<<ListboxSelect>>', lambda e: update_selection_info())
         update_selection_info()
@@ -354,14 +1415,23 @@ class ChartConfigUI:
                 selected_columns.append(col['index'])
                 selected_names.append(col['name'])
             
+            roles = None
+            if kind != 'category':
+                roles = [role_vars[col_idx].get() for col_idx in selected_columns]
+                if not roles_complete(kind, roles):
+                    messagebox.showwarning("Series Roles", f"{chart_type_name} needs {ROLE_REQUIREMENTS[kind]}.")
+                    return
+            
             self.column_selections[sheet_name] = {
                 'indices': selected_columns,
                 'names': selected_names,
-                'columns': sheet_info['numeric_columns']
+                'columns': sheet_info['numeric_columns'],
+                'roles': roles
             }
             
             # Update the button text
             self.update_series_button_text(sheet_name)
+            self.update_preview(sheet_name)
             
             dialog.destroy()
         
@@ -398,6 +1468,7 @@ class ChartConfigUI:
         
         self.chart_selections.clear()
         self.sheet_enabled.clear()
+        self.preview_canvases.clear()
         # Don't clear column_selections - preserve previous selections
         self.percentage_mode.clear()
         
@@ -428,6 +1499,7 @@ class ChartConfigUI:
         ttk.Label(header_frame, text="%", font=('Arial', 9, 'bold'), width=3).grid(row=0, column=3)
         ttk.Label(header_frame, text="Chart Type", font=('Arial', 9, 'bold'), width=15).grid(row=0, column=4)
         ttk.Label(header_frame, text="Slide", font=('Arial', 9, 'bold'), width=6).grid(row=0, column=5)
+        ttk.Label(header_frame, text="Preview", font=('Arial', 9, 'bold'), width=10).grid(row=0, column=6)
         
         # Create selector for each sheet
         for i, sheet_info in enumerate(self.all_sheets_info):
@@ -507,6 +1579,17 @@ class ChartConfigUI:
             slide_label = ttk.Label(frame, text="", width=6)
             slide_label.grid(row=0, column=5)
             
+            # Thumbnail preview, redrawn when the chart type or percentage mode changes
+            if sheet_info['is_valid']:
+                preview_canvas = tk.Canvas(frame, width=THUMBNAIL_SIZE[0], height=THUMBNAIL_SIZE[1],
+                                           background="white", highlightthickness=1, cursor="hand2")
+                preview_canvas.grid(row=0, column=6, padx=5)
+                preview_canvas.bind("<Button-1>", lambda e, sn=sheet_name: self.open_preview(sn))
+                self.preview_canvases[sheet_name] = preview_canvas
+                chart_var.trace_add("write", lambda *args, sn=sheet_name: self.update_preview(sn))
+                percentage_var.trace_add("write", lambda *args, sn=sheet_name: self.update_preview(sn))
+                self.update_preview(sheet_name)
+            
             # Store references
             frame.slide_label = slide_label
             frame.sheet_name = sheet_name
@@ -524,9 +1607,71 @@ class ChartConfigUI:
         selector_canvas.bind_all("<Button-4>", lambda e: selector_canvas.yview_scroll(-1, "units"))
         selector_canvas.bind_all("<Button-5>", lambda e: selector_canvas.yview_scroll(1, "units"))
     
+    def get_thumbnail(self, sheet_name):
+        """Return thumbnail primitives for a sheet, cached by data hash plus chart config"""
+        sheet_info = next((s for s in self.all_sheets_info if s['name'] == sheet_name), None)
+        column_info = self.column_selections.get(sheet_name)
+        if not sheet_info or not sheet_info['is_valid'] or not column_info:
+            return []
+        
+        chart_type_name = self.chart_selections[sheet_name].get()
+        percentage_mode = self.percentage_mode[sheet_name].get()
+        key = (sheet_info['data_hash'], chart_type_name, tuple(column_info['indices']),
+               tuple(column_info.get('roles') or ()), percentage_mode)
+        if key not in self.thumbnail_cache:
+            chart_data, line_series_count = build_chart_data(
+                self.sheet_data[sheet_name], column_info['indices'], column_info['names'],
+                percentage_mode, chart_type_name, column_info.get('roles'))
+            colors = [f"#{color}" for color in self.style_engine.theme.series_colors]
+            if chart_kind(chart_type_name) in ('xy', 'bubble'):
+                series_points = [(list(series.x_values), list(series.y_values),
+                                  list(getattr(series, 'bubble_sizes', []))) for series in chart_data]
+                self.thumbnail_cache[key] = xy_thumbnail_primitives(series_points, colors)
+            else:
+                categories = [c.label for c in chart_data.categories]
+                series_values = [list(series.values) for series in chart_data]
+                self.thumbnail_cache[key] = thumbnail_primitives(chart_type_name, categories, series_values,
+                                                                 colors, line_series_count)
+        return self.thumbnail_cache[key]
+    
+    def update_preview(self, sheet_name):
+        """Redraw the inline thumbnail for a sheet row"""
+        canvas = self.preview_canvases.get(sheet_name)
+        if canvas is None or sheet_name not in self.percentage_mode:
+            return
+        try:
+            draw_thumbnail(canvas, self.get_thumbnail(sheet_name), *THUMBNAIL_SIZE)
+        except Exception as e:
+            canvas.delete("all")
+            print(f"Warning: Could not render preview for {sheet_name}: {e}")
+    
+    def open_preview(self, sheet_name):
+        """Show a larger preview of a sheet's chart from the cached thumbnail"""
+        dialog = tk.Toplevel(self.root)
+        chart_type_name = self.chart_selections[sheet_name].get()
+        dialog.title(f"Preview - {sheet_name} ({chart_type_name})")
+        dialog.transient(self.root)
+        
+        canvas = tk.Canvas(dialog, width=PREVIEW_SIZE[0], height=PREVIEW_SIZE[1], background="white")
+        canvas.pack(padx=10, pady=10)
+        try:
+            draw_thumbnail(canvas, self.get_thumbnail(sheet_name), *PREVIEW_SIZE, pad=10)
+            column_info = self.column_selections.get(sheet_name)
+            detail = ", ".join(column_info['names']) if column_info else "No columns selected"
+        except Exception as e:
+            # Same failures as the inline thumbnail, e.g. series roles that don't fit the chart type
+            canvas.delete("all")
+            detail = f"Preview unavailable: {e}"
+            print(f"Warning: Could not render preview for {sheet_name}: {e}")
+        
+        ttk.Label(dialog, text=detail, foreground="gray", wraplength=PREVIEW_SIZE[0]).pack(pady=(0, 5))
+        ttk.Button(dialog, text="Close", command=dialog.destroy).pack(pady=(0, 10))
+    
     def update_slide_numbers(self):
         """Update slide numbers based on enabled sheets"""
-        slide_num = self.starting_slide.get()
+        starting_slide = self.starting_slide.get()
+        charts_per_slide = self.charts_per_slide.get()
+        chart_count = 0
         
         for widget in self.chart_frame.winfo_children():
             if isinstance(widget, tk.Canvas):
@@ -535,8 +1680,9 @@ class ChartConfigUI:
                     for frame in scrollable_frame.winfo_children():
                         if hasattr(frame, 'slide_label') and hasattr(frame, 'sheet_name'):
                             if self.sheet_enabled.get(frame.sheet_name, tk.BooleanVar()).get():
+                                slide_num = starting_slide + chart_count // charts_per_slide
                                 frame.slide_label.config(text=f"{slide_num}")
-                                slide_num += 1
+                                chart_count += 1
                             else:
                                 frame.slide_label.config(text="—")
     
@@ -569,7 +1715,8 @@ class ChartConfigUI:
     def get_enabled_sheets(self):
         """Get list of enabled sheets with their configuration"""
         enabled_sheets = []
-        slide_num = self.starting_slide.get()
+        starting_slide = self.starting_slide.get()
+        charts_per_slide = self.charts_per_slide.get()
         
         for sheet_info in self.all_sheets_info:
             sheet_name = sheet_info['name']
@@ -580,19 +1727,41 @@ class ChartConfigUI:
                     enabled_sheets.append({
                         'name': sheet_name,
                         'chart_type': self.chart_selections[sheet_name].get(),
-                        'slide_number': slide_num,
+                        'slide_number': starting_slide + len(enabled_sheets) // charts_per_slide,
                         'data_rows': sheet_info['valid_rows'],
                         'column_indices': column_info['indices'],
                         'column_names': column_info['names'],
+                        'series_roles': column_info.get('roles'),
                         'percentage_mode': self.percentage_mode.get(sheet_name, tk.BooleanVar()).get()
                     })
-                    slide_num += 1
         
         return enabled_sheets
     
-    def generate_ppt(self):
+    def retry_failed_sheets(self):
+        """Re-run only the sheets that failed last time, reusing the output deck"""
+        if not self.failure_report:
+            messagebox.showinfo("Nothing to Retry", "The last run had no failed sheets.")
+            return
+        if not os.path.exists(self.output_path.get()):
+            messagebox.showerror("Error", "Output PowerPoint not found - generate the full deck first.")
+            return
+        self.generate_ppt(retry=True)
+    
+    def show_formatting_cost(self):
+        """Show the style engine's formatting cost per chart type for the last run"""
+        timing_report = self.style_engine.timing_report()
+        if not timing_report:
+            messagebox.showinfo("Formatting Cost", "No charts have been formatted yet.")
+            return
+        messagebox.showinfo("Formatting Cost", f"Chart formatting cost:\n\n{timing_report}")
+    
+    def generate_ppt(self, retry=False):
         enabled_sheets = self.get_enabled_sheets()
         
+        if retry:
+            failed_names = {failure['sheet'] for failure in self.failure_report}
+            enabled_sheets = [s for s in enabled_sheets if s['name'] in failed_names]
+        
         if not enabled_sheets:
             messagebox.showerror("Error", "No sheets selected for chart generation!")
             return
@@ -616,43 +1785,112 @@ class ChartConfigUI:
             
             self.root.update()
             
-            self.create_powerpoint(progress_label, progress_bar, detail_label, enabled_sheets)
+            self.failure_report = self.create_powerpoint(progress_label, progress_bar, detail_label,
+                                                         enabled_sheets, retry=retry)
             
             progress_window.destroy()
             
-            success_msg = f"PowerPoint created successfully!\n\n"
-            success_msg += f"📊 Charts created: {len(enabled_sheets)}\n"
+            charts_created = len(enabled_sheets) - len(self.failure_report)
+            if not self.failure_report:
+                success_msg = "PowerPoint created successfully!\n\n"
+            elif charts_created:
+                success_msg = "PowerPoint created with errors.\n\n"
+            else:
+                success_msg = "No charts were created - every selected sheet failed.\n\n"
+            success_msg += f"📊 Charts created: {charts_created}\n"
             success_msg += f"💾 Saved as: {os.path.basename(self.output_path.get())}\n\n"
             success_msg += f"📂 Full path: {self.output_path.get()}"
             
-            messagebox.showinfo("Success! 🎉", success_msg)
+            if self.optimization_report:
+                report = self.optimization_report
+                success_msg += f"\n🗜️ Optimised: {report['size_before'] // 1024} KB → {report['size_after'] // 1024} KB "
+                success_msg += f"({report['duplicates_removed']} duplicate parts, "
+                success_msg += f"{report['layouts_removed']} layouts, {report['masters_removed']} masters removed)"
+            
+            if self.failure_report:
+                success_msg += f"\n\n⚠️ Failed sheets: {len(self.failure_report)}\n"
+                for failure in self.failure_report[:10]:
+                    error = failure['exception']
+                    success_msg += f"   • {failure['sheet']} [{failure['stage']}]: {type(error).__name__}: {error}\n"
+                if len(self.failure_report) > 10:
+                    success_msg += f"   ... and {len(self.failure_report)-10} more\n"
+                success_msg += "\nUse \"Retry Failed Sheets\" to rerun only these sheets."
+                if charts_created:
+                    messagebox.showwarning("Completed with Errors", success_msg)
+                else:
+                    messagebox.showerror("Generation Failed", success_msg)
+            else:
+                messagebox.showinfo("Success! 🎉", success_msg)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to create PowerPoint:\n\n{str(e)}")
     
-    def create_powerpoint(self, progress_label, progress_bar, detail_label, enabled_sheets):
-        progress_label.config(text="Loading Excel data...")
-        detail_label.config(text=f"Reading {os.path.basename(self.excel_path.get())}")
+    def prepare_chart_data(self, sheet_config):
+        """Build (chart_data, line_series_count) for a sheet from the sheet catalog"""
+        return build_chart_data(self.sheet_data[sheet_config['name']], sheet_config['column_indices'],
+                                sheet_config['column_names'], sheet_config['percentage_mode'],
+                                sheet_config['chart_type'], sheet_config.get('series_roles'))
+    
+    def create_powerpoint(self, progress_label, progress_bar, detail_label, enabled_sheets, retry=False):
+        """Build the deck, isolating failures per sheet.
+        
+        Returns a list of failures, each a dict with the sheet name, the stage that
+        failed and the exception. Sheets that fail leave nothing behind in the deck.
+        """
+        # Sheet data comes from the catalog built by load_excel_info, so generation
+        # uses exactly the tables and headers that were analysed
+        progress_label.config(text="Preparing sheet data...")
+        detail_label.config(text=f"Using parsed tables from {os.path.basename(self.excel_path.get())}")
         self.root.update()
         
-        sheets = pd.read_excel(self.excel_path.get(), sheet_name=None)
         progress_bar['value'] += 1
         self.root.update()
         
+        # A retry reuses the deck written by the previous run
+        base_ppt = self.output_path.get() if retry else self.template_path.get()
         progress_label.config(text="Loading PowerPoint template...")
-        detail_label.config(text=f"Opening {os.path.basename(self.template_path.get())}")
+        detail_label.config(text=f"Opening {os.path.basename(base_ppt)}")
         self.root.update()
         
-        prs = Presentation(self.template_path.get())
-        slide_layout = prs.slide_layouts[min(2, len(prs.slide_layouts)-1)]
+        prs = Presentation(base_ppt)
+        self.style_engine.timings.clear()
+        if retry and self.slide_layout_name and prs.slide_layouts.get_by_name(self.slide_layout_name):
+            # Unused layouts may have been pruned, so find the layout by name
+            slide_layout = prs.slide_layouts.get_by_name(self.slide_layout_name)
+        else:
+            slide_layout = prs.slide_layouts[min(2, len(prs.slide_layouts)-1)]
+        self.slide_layout_name = slide_layout.name
         progress_bar['value'] += 1
         self.root.update()
         
+        charts_per_slide = self.charts_per_slide.get()
+        original_slide_count = len(prs.slides)
+        if retry and self.retry_insert_index is not None:
+            insert_index = min(self.retry_insert_index, original_slide_count)
+        else:
+            insert_index = min(max(self.starting_slide.get() - 1, 0), original_slide_count)
+        
+        # Empty chart/content placeholders in the template are filled before adding slides
+        template_slots = []
+        if self.fill_template_slides.get():
+            template_slots = find_template_chart_slots(prs, insert_index)
+        new_chart_count = 0
+        
+        # Build chart data for every sheet in one batch before touching the deck;
+        # errors are kept and reported against the sheet's data stage below
+        prepared_data = {}
+        for sheet_config in enabled_sheets:
+            try:
+                prepared_data[sheet_config['name']] = self.prepare_chart_data(sheet_config)
+            except Exception as e:
+                prepared_data[sheet_config['name']] = e
+        slide_titles = []  # (slide, titles) for new slides, set once their charts are placed
+        failures = []
+        
         # Process each enabled sheet
         for i, sheet_config in enumerate(enabled_sheets):
             sheet_name = sheet_config['name']
             chart_type_name = sheet_config['chart_type']
-            chart_type = CHART_TYPES[chart_type_name]
             column_indices = sheet_config['column_indices']
             column_names = sheet_config['column_names']
             percentage_mode = sheet_config['percentage_mode']
@@ -662,167 +1900,134 @@ class ChartConfigUI:
             detail_label.config(text=f"Processing {sheet_name} → {chart_type_name} ({series_info})")
             self.root.update()
             
-            # Get and clean data
-            df = sheets[sheet_name].copy()
-            
-            # Filter out Base rows and handle NaN in first column
-            df = df[~df.iloc[:, 0].astype(str).str.startswith("Base")]
-            df = df.dropna(subset=[df.columns[0]])
-            
-            # Extract the label column
-            labels = df.iloc[:, 0].astype(str)
-            
-            # Create chart data with multiple series
-            chart_data = CategoryChartData()
-            chart_data.categories = labels.tolist()
-            
-            # Add each selected column as a series
-            for col_idx, col_name in zip(column_indices, column_names):
-                data_column = pd.to_numeric(df.iloc[:, col_idx], errors="coerce")
+            stage = "data"
+            chart_slide = chart_shape = placeholder = None
+            new_slide = False
+            try:
+                chart_type = CHART_TYPES[chart_type_name]
                 
-                # Create clean series data
-                clean_data = data_column.fillna(0)  # Fill NaN with 0 for charting
+                prepared = prepared_data[sheet_name]
+                if isinstance(prepared, Exception):
+                    raise prepared
+                chart_data, line_series_count = prepared
                 
-                # Apply percentage conversion if enabled
-                if percentage_mode:
-                    clean_data = clean_data.round(1)
+                # Build chart title
+                pct_suffix = " (%)" if percentage_mode else ""
+                if len(column_names) == 1:
+                    title_text = f"{sheet_name} - {column_names[0]}{pct_suffix}"
+                else:
+                    title_text = f"{sheet_name} - Multi-Series Chart{pct_suffix}"
                 
-                chart_data.add_series(col_name, clean_data.tolist())
-            
-            # Create slide
-            slide = prs.slides.add_slide(slide_layout)
-            
-            # Add title
-            pct_suffix = " (%)" if percentage_mode else ""
-            if len(column_names) == 1:
-                title_text = f"{sheet_name} - {column_names[0]}{pct_suffix}"
-            else:
-                title_text = f"{sheet_name} - Multi-Series Chart{pct_suffix}"
-            
-            if slide.shapes.title:
-                slide.shapes.title.text = title_text
+                stage = "slide"
+                chart_title = None
+                if template_slots:
+                    # Fill the next template placeholder in place
+                    chart_slide, placeholder = template_slots[0]
+                    x, y, cx, cy = placeholder_box(placeholder)
+                    title_shape = chart_slide.shapes.title
+                    if title_shape is None or title_shape.text_frame.text.strip():
+                        chart_title = title_text
+                else:
+                    # Start a new slide for the first chart of each grid
+                    position = new_chart_count % charts_per_slide
+                    if position == 0:
+                        slide = prs.slides.add_slide(slide_layout)
+                        new_slide = True
+                    
+                    # Grid charts carry their own title since the slide title is shared
+                    if charts_per_slide > 1:
+                        chart_title = title_text
+                    x, y, cx, cy = grid_chart_box(position, charts_per_slide)
+                    chart_slide = slide
+                
+                stage = "chart"
+                chart_shape = chart_slide.shapes.add_chart(chart_type, x, y, cx, cy, chart_data)
+                chart = chart_shape.chart
+                
+                if chart_type_name in COMBO_CHART_NAMES:
+                    make_combo_chart(chart, line_series_count)
+                
+                if chart_title:
+                    chart.has_title = True
+                    chart.chart_title.text_frame.text = chart_title
+                    chart.chart_title.text_frame.paragraphs[0].font.size = Pt(11)
+                
+                # Format chart
+                stage = "format"
+                self.format_chart(chart, chart_type, percentage_mode, len(chart.series),
+                                  chart_type_name)
+            except Exception as e:
+                failures.append({'sheet': sheet_name, 'stage': stage, 'exception': e})
+                print(f"Warning: {sheet_name} failed during {stage}: {e}")
+                
+                # Roll back anything this sheet added so a retry starts clean
+                if chart_shape is not None:
+                    remove_chart(chart_slide, chart_shape)
+                if new_slide:
+                    delete_slide(prs, slide)
             else:
-                title_box = slide.shapes.add_textbox(Inches(1), Inches(0.5), Inches(8), Inches(1))
-                title_frame = title_box.text_frame
-                p = title_frame.paragraphs[0]
-                p.text = title_text
-                p.font.size = Pt(24)
-            
-            # Create chart
-            x, y, cx, cy = Inches(1), Inches(2), Inches(8), Inches(5)
-            chart_shape = slide.shapes.add_chart(chart_type, x, y, cx, cy, chart_data)
-            chart = chart_shape.chart
-            
-            # Format chart
-            self.format_chart(chart, chart_type, percentage_mode, len(column_indices))
+                if placeholder is not None:
+                    template_slots.pop(0)
+                    remove_shape(placeholder)
+                    if chart_title is None:
+                        chart_slide.shapes.title.text = title_text
+                    insert_index = max(insert_index, prs.slides.index(chart_slide) + 1)
+                else:
+                    if new_slide:
+                        slide_titles.append((slide, []))
+                    slide_titles[-1][1].append(title_text if charts_per_slide == 1 else sheet_name)
+                    new_chart_count += 1
             
             progress_bar['value'] += 1
             self.root.update()
         
+        # Grid slides are titled by their sheet range; each chart keeps its own title
+        for slide, titles in slide_titles:
+            self.set_slide_title(slide, titles[0] if len(titles) == 1 else f"{titles[0]} – {titles[-1]}")
+        
+        # Move the new slides to the chosen position instead of leaving them at the end
+        added_slides = len(prs.slides) - original_slide_count
+        if added_slides:
+            move_slides(prs, added_slides, insert_index)
+        self.retry_insert_index = insert_index + added_slides
+        
         # Save presentation
         progress_label.config(text="Saving PowerPoint presentation...")
         detail_label.config(text=f"Writing to {os.path.basename(self.output_path.get())}")
         self.root.update()
         
+        self.optimization_report = None
+        if self.optimize_output.get():
+            removed_layouts, removed_masters = prune_unused_layouts(prs)
+        
         prs.save(self.output_path.get())
+        
+        if self.optimize_output.get():
+            progress_label.config(text="Optimising PowerPoint size...")
+            self.root.update()
+            self.optimization_report = compact_pptx(self.output_path.get())
+            self.optimization_report['layouts_removed'] = removed_layouts
+            self.optimization_report['masters_removed'] = removed_masters
+        
+        return failures
     
-    def format_chart(self, chart, chart_type, percentage_mode=False, series_count=1):
-        """Apply formatting based on chart type"""
-        try:
-            if chart_type in [XL_CHART_TYPE.PIE, XL_CHART_TYPE.DOUGHNUT]:
-                # Pie/Doughnut chart formatting
-                chart.has_legend = True
-                chart.legend.position = XL_LEGEND_POSITION.RIGHT
-                chart.plots[0].has_data_labels = True
-                
-                if percentage_mode:
-                    # Show custom percentage labels with 1 decimal
-                    chart.plots[0].data_labels.show_percentage = False
-                    chart.plots[0].data_labels.show_value = True
-                    chart.plots[0].data_labels.number_format = '0.0"%"'
-                else:
-                    chart.plots[0].data_labels.show_percentage = True
-                    chart.plots[0].data_labels.show_value = False
-                
-                chart.plots[0].data_labels.show_category_name = False
-            else:
-                # Bar, Column, Line, Area charts
-                # Show legend if multi-series
-                if series_count > 1:
-                    chart.has_legend = True
-                    chart.legend.position = XL_LEGEND_POSITION.BOTTOM
-                    chart.legend.font.size = Pt(9)
-                else:
-                    chart.has_legend = False
-                
-                # Only set axis properties for charts that have axes
-                if hasattr(chart, 'value_axis') and hasattr(chart, 'category_axis'):
-                    try:
-                        chart.value_axis.has_major_gridlines = False
-                        chart.value_axis.has_minor_gridlines = False
-                        chart.category_axis.has_major_gridlines = False
-                        chart.category_axis.has_minor_gridlines = False
-                        chart.value_axis.tick_labels.font.size = Pt(10)
-                        chart.category_axis.tick_labels.font.size = Pt(10)
-                        
-                        # Set axis number format for percentage mode
-                        if percentage_mode:
-                            chart.value_axis.tick_labels.number_format = '0.0"%"'
-                    except:
-                        pass
-                
-                # Add data labels (optional for multi-series to avoid clutter)
-                try:
-                    if series_count == 1:
-                        chart.plots[0].has_data_labels = True
-                        chart.plots[0].data_labels.show_value = True
-                        
-                        # Set data label format for percentage mode
-                        if percentage_mode:
-                            chart.plots[0].data_labels.number_format = '0.0"%"'
-                        else:
-                            chart.plots[0].data_labels.number_format = '0.0'
-                except:
-                    pass
-            
-            # Set colors for all series
-            for series_idx, series in enumerate(chart.series):
-                try:
-                    color = SERIES_COLORS[series_idx % len(SERIES_COLORS)]
-                    
-                    if chart_type in [XL_CHART_TYPE.PIE, XL_CHART_TYPE.DOUGHNUT]:
-                        # For pie charts, color individual points
-                        for point_idx, point in enumerate(series.points):
-                            point_color = SERIES_COLORS[point_idx % len(SERIES_COLORS)]
-                            point.format.fill.solid()
-                            point.format.fill.fore_color.rgb = point_color
-                    else:
-                        # For other chart types
-                        series.format.fill.solid()
-                        series.format.fill.fore_color.rgb = color
-                        
-                        # Set line color for line charts
-                        if chart_type == XL_CHART_TYPE.LINE:
-                            series.format.line.color.rgb = color
-                            series.format.line.width = Pt(2.5)
-                        
-                        # Set gap width for bar/column charts
-                        if hasattr(chart.plots[0], 'gap_width') and chart_type in [
-                            XL_CHART_TYPE.BAR_CLUSTERED, XL_CHART_TYPE.COLUMN_CLUSTERED,
-                            XL_CHART_TYPE.BAR_STACKED, XL_CHART_TYPE.COLUMN_STACKED
-                        ]:
-                            chart.plots[0].gap_width = 50
-                except Exception as e:
-                    print(f"Warning: Could not set color for series {series_idx}: {e}")
-            
-            # Set data label font size
-            try:
-                chart.plots[0].data_labels.font.size = Pt(9)
-            except:
-                pass
-                
-        except Exception as e:
-            print(f"Warning: Could not apply all formatting to chart: {e}")
+    def set_slide_title(self, slide, title_text):
+        """Set the slide title, adding a text box if the layout has no title placeholder"""
+        if slide.shapes.title:
+            slide.shapes.title.text = title_text
+        else:
+            title_box = slide.shapes.add_textbox(Inches(1), Inches(0.5), Inches(8), Inches(1))
+            title_frame = title_box.text_frame
+            p = title_frame.paragraphs[0]
+            p.text = title_text
+            p.font.size = Pt(24)
+    
+    def format_chart(self, chart, chart_type, percentage_mode=False, series_count=1, chart_type_name=None):
+        """Apply the theme's style bundle for the chart type.
+        
+        Errors are left to the caller so they are reported against the sheet.
+        """
+        self.style_engine.apply(chart, chart_type, percentage_mode, series_count, chart_type_name)
 
 def main():
     root = tk.Tk()